@@ -1,5 +1,7 @@
+import mmap
 import os
-from helpers import load_input_lines
+import re
+from helpers import file_path, load_input_lines
 
 TEST = os.environ.get("AOC_TEST", False)
 
@@ -18,6 +20,22 @@ numbers = {
     "nine": "9",
 }
 
+number_pattern = re.compile("(?=(" + "|".join(numbers) + "))")
+
+
+def find_first_and_last(s):
+    """
+    >>> find_first_and_last("xtwone3four")
+    ('2', '4')
+    >>> find_first_and_last("eightwo")
+    ('8', '2')
+    >>> find_first_and_last("treb7uchet")
+    ('7', '7')
+    """
+    matches = number_pattern.findall(s)
+    return numbers[matches[0]], numbers[matches[-1]]
+
+
 def find_first(s, numbers=numbers):
     indices = {s.find(n): numbers[n] for n in numbers if s.find(n) > -1}
     first_index = min(indices)
@@ -31,8 +49,7 @@ def find_last(s):
 
 
 def get_number_for_line(s):
-    first_digit_str = find_first(s)
-    last_digit_str = find_last(s)
+    first_digit_str, last_digit_str = find_first_and_last(s)
     # indices = {s.find(n): numbers[n] for n in numbers if s.find(n) > -1}
     # first_index, last_index = min(indices), max(indices)
     # first_digit_str = indices[first_index]
@@ -41,14 +58,42 @@ def get_number_for_line(s):
     return int(first_digit_str + last_digit_str)
 
 
+non_digit_bytes = bytes(byte for byte in range(256) if byte not in b"0123456789\n")
+
+
+def calibration_values(data, block_size=1 << 20):
+    """
+    Work through data in blocks of about block_size bytes, each ending on a
+    newline, so only one block is copied out of a memory map at a time.
+
+    >>> data = b"1abc2\\npqr3stu8vwx\\na1b2c3d4e5f\\ntreb7uchet"
+    >>> list(calibration_values(data))
+    [12, 38, 15, 77]
+    >>> list(calibration_values(data, block_size=8))
+    [12, 38, 15, 77]
+    """
+    start = 0
+    while start < len(data):
+        stop = len(data)
+        if start + block_size < len(data):
+            newline = data.rfind(b"\n", start, start + block_size)
+            if newline == -1:
+                newline = data.find(b"\n", start + block_size)
+            if newline != -1:
+                stop = newline + 1
+        digits_block = data[start:stop].translate(None, non_digit_bytes)
+        for digits in digits_block.split(b"\n"):
+            if digits:
+                yield (digits[0] - 48) * 10 + (digits[-1] - 48)
+        start = stop
+
+
 def solve_a():
-    # running_total = 0
-    # for line in input_lines:
-    #     first_digit = next(c for c in line if c.isdigit())
-    #     last_digit = next(c for c in reversed(line) if c.isdigit())
-    #     running_total += int(first_digit + last_digit)
-    # return running_total
-    pass
+    with open(file_path(1, TEST), "rb") as input_file:
+        if os.fstat(input_file.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return sum(calibration_values(data))
 
 
 def solve_b():
@@ -1,7 +1,10 @@
 import re
 import os
+from array import array
+from bisect import bisect_right
+from itertools import compress
 from math import prod
-from helpers import load_input_lines
+from helpers import file_path, load_input_lines
 
 TEST = os.environ.get("AOC_TEST", False)
 
@@ -103,18 +106,156 @@ def power_of_minimum_set(game):
     return power(minimum_possible_set(game))
 
 
-input_games = load_input_lines(2, test=TEST, transform=parse_game)
+def maximum_columns(games):
+    """
+    >>> games = [parse_game("Game 5: 6 red, 1 blue, 3 green; 2 blue, 1 red, 2 green")]
+    >>> maximum_columns(games)
+    {'id': [5], 'red': [6], 'green': [3], 'blue': [2]}
+    """
+    columns = {"id": [], "red": [], "green": [], "blue": []}
+    for game in games:
+        columns["id"].append(game["id"])
+        for colour, number in minimum_possible_set(game).items():
+            columns[colour].append(number)
+    return columns
+
+
+flag_table = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class GameIndex:
+    """
+    Answers "which games are possible with these limits?" for many limits.
+    For each colour, every distinct maximum is paired with a bitmask of the
+    games whose maximum for that colour is at most that value, so a query is
+    one bisect per colour and an AND of three integers.
+
+    >>> games = [
+    ...     parse_game("Game 1: 3 blue, 4 red; 1 red, 2 green, 6 blue; 2 green"),
+    ...     parse_game("Game 3: 8 green, 6 blue, 20 red; 5 blue, 4 red, 13 green"),
+    ...     parse_game("Game 5: 6 red, 1 blue, 3 green; 2 blue, 1 red, 2 green"),
+    ... ]
+    >>> index = GameIndex(maximum_columns(games))
+    >>> index.possible_game_ids(limits)
+    [1, 5]
+    >>> index.possible_game_ids({"red": 20, "green": 13, "blue": 5})
+    [5]
+    >>> index.possible_game_ids({"red": 0, "green": 13, "blue": 14})
+    []
+    """
+
+    def __init__(self, columns):
+        self.ids = columns["id"]
+        self.thresholds = {}
+        for colour in ("red", "green", "blue"):
+            games_by_maximum = {}
+            for i, maximum in enumerate(columns[colour]):
+                games_by_maximum.setdefault(maximum, []).append(i)
+            maxima = sorted(games_by_maximum)
+            masks = []
+            bits = bytearray(b"0" * len(self.ids))
+            for maximum in maxima:
+                for i in games_by_maximum[maximum]:
+                    bits[i] = ord("1")
+                masks.append(int(bits[::-1], 2))
+            self.thresholds[colour] = (maxima, masks)
+
+    def possible_mask(self, limits):
+        possible = (1 << len(self.ids)) - 1
+        for colour, (maxima, masks) in self.thresholds.items():
+            i = bisect_right(maxima, limits[colour]) - 1
+            possible &= masks[i] if i >= 0 else 0
+        return possible
+
+    def possible_flags(self, limits):
+        """
+        One byte per game, 1 if it is possible and 0 if not, decoded from the
+        mask in a single pass.
+        """
+        bits = bin(self.possible_mask(limits))[:1:-1]
+        return bits.encode().translate(flag_table)
+
+    def possible_game_ids(self, limits):
+        return list(compress(self.ids, self.possible_flags(limits)))
+
+    def sum_of_possible_ids(self, limits):
+        """
+        >>> index = GameIndex({"id": [1, 2, 3], "red": [4, 20, 1], "green": [2, 3, 1], "blue": [6, 4, 1]})
+        >>> index.sum_of_possible_ids(limits)
+        4
+        """
+        return sum(compress(self.ids, self.possible_flags(limits)))
+
+
+game_token_pattern = re.compile(r"Game (\d+):|(\d+) (red|green|blue)|;")
+
+
+def parse_game_columns(text):
+    """
+    Parse a whole game log in one scan into one row per cube set.
+
+    >>> columns = parse_game_columns("Game 1: 3 blue, 4 red; 1 red, 2 green\\nGame 2: 1 blue\\n")
+    >>> {name: column.tolist() for name, column in columns.items()}
+    {'id': [1, 1, 2], 'set': [0, 1, 0], 'red': [4, 1, 0], 'green': [0, 2, 0], 'blue': [3, 0, 1]}
+    """
+    columns = {name: array("q") for name in ("id", "set", "red", "green", "blue")}
+    for token in game_token_pattern.finditer(text):
+        game_id_str, number_str, colour = token.groups()
+        if colour:
+            columns[colour][-1] = int(number_str)
+            continue
+        if game_id_str:
+            columns["id"].append(int(game_id_str))
+            columns["set"].append(0)
+        else:
+            columns["id"].append(columns["id"][-1])
+            columns["set"].append(columns["set"][-1] + 1)
+        for colour in ("red", "green", "blue"):
+            columns[colour].append(0)
+    return columns
+
+
+def maximum_columns_from_sets(columns):
+    """
+    >>> columns = parse_game_columns("Game 1: 3 blue, 4 red; 1 red, 2 green\\nGame 2: 1 blue\\n")
+    >>> {name: column.tolist() for name, column in maximum_columns_from_sets(columns).items()}
+    {'id': [1, 2], 'red': [4, 0], 'green': [2, 0], 'blue': [3, 1]}
+    """
+    maxima = {name: array("q") for name in ("id", "red", "green", "blue")}
+    rows = zip(columns["id"], columns["set"], columns["red"], columns["green"], columns["blue"])
+    for game_id, set_index, red, green, blue in rows:
+        if set_index == 0:
+            maxima["id"].append(game_id)
+            maxima["red"].append(red)
+            maxima["green"].append(green)
+            maxima["blue"].append(blue)
+        else:
+            maxima["red"][-1] = max(maxima["red"][-1], red)
+            maxima["green"][-1] = max(maxima["green"][-1], green)
+            maxima["blue"][-1] = max(maxima["blue"][-1], blue)
+    return maxima
+
+
+def minimum_set_powers(maxima):
+    """
+    >>> minimum_set_powers({"id": [1, 2], "red": [4, 6], "green": [2, 3], "blue": [6, 2]})
+    [48, 36]
+    """
+    return [
+        red * green * blue
+        for red, green, blue in zip(maxima["red"], maxima["green"], maxima["blue"])
+    ]
+
+
+input_maxima = maximum_columns_from_sets(parse_game_columns(file_path(2, TEST).read_text()))
 
 
 def solve_a():
-    possible_games = [game["id"] for game in input_games if game_is_possible(game)]
-    return sum(possible_games)
+    index = GameIndex(input_maxima)
+    return index.sum_of_possible_ids(limits)
 
 def solve_b():
-    return sum(
-        power(minimum_possible_set(game))
-        for game in input_games
-    )
+    return sum(minimum_set_powers(input_maxima))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 import re
 import os
+from collections import deque
 from math import prod
-from helpers import load_input_lines
+from helpers import file_path, load_input_lines
 
 TEST = os.environ.get("AOC_TEST", False)
 
@@ -175,21 +176,205 @@ def is_gear(star_location, number_locations):
     }
 
 
+def get_number_labels(lines):
+    """
+    Label each number with its index in the returned list of numbers, and
+    map every location a digit occupies to the label of its number.
+
+    >>> schematic = load_input_lines(3, test=True)
+    >>> numbers, labels = get_number_labels(schematic)
+    >>> numbers[:3]
+    [467, 114, 35]
+    >>> labels[(2, 0)], labels[(5, 0)], (3, 0) in labels
+    (0, 1, False)
+    """
+    number_locations = get_number_locations(lines)
+    numbers = [number_location["number"] for number_location in number_locations]
+    labels = {
+        location: label
+        for label, number_location in enumerate(number_locations)
+        for location in number_location["locations"]
+    }
+    return numbers, labels
+
+
+def get_symbol_locations(lines):
+    """
+    >>> schematic = load_input_lines(3, test=True)
+    >>> locations = get_symbol_locations(schematic)
+    >>> locations[:3]
+    [(3, 1), (6, 3), (3, 4)]
+    """
+    locations = []
+    for line_number, line in enumerate(lines):
+        for symbol_match in re.finditer(r"[^.\d]", line):
+            locations.append((symbol_match.start(), line_number))
+    return locations
+
+
+def neighbouring_labels(location, labels):
+    """
+    >>> schematic = load_input_lines(3, test=True)
+    >>> numbers, labels = get_number_labels(schematic)
+    >>> sorted(neighbouring_labels((3, 1), labels))
+    [0, 2]
+    """
+    x, y = location
+    return {
+        labels[neighbour]
+        for dx in (-1, 0, 1)
+        for dy in (-1, 0, 1)
+        if (neighbour := (x+dx, y+dy)) in labels
+    }
+
+
+def find_gear_ratio(star_location, numbers, labels):
+    """
+    >>> schematic = load_input_lines(3, test=True)
+    >>> numbers, labels = get_number_labels(schematic)
+    >>> find_gear_ratio((3, 1), numbers, labels)
+    16345
+    >>> find_gear_ratio((3, 4), numbers, labels)
+    0
+    """
+    neighbouring_numbers = [numbers[label] for label in neighbouring_labels(star_location, labels)]
+    if len(neighbouring_numbers) == 2:
+        return prod(neighbouring_numbers)
+    return 0
+
+
+SYMBOL_TABLE = bytes(
+    ord("0") if chr(byte) in ".0123456789" else ord("1")
+    for byte in range(256)
+)
+
+
+def get_symbol_masks(lines):
+    """
+    One bitmask per line, with bit x set when there is a symbol at column x.
+
+    >>> [bin(mask) for mask in get_symbol_masks(["..*.", "1..#"])]
+    ['0b100', '0b1000']
+    """
+    return [
+        int(line.encode().translate(SYMBOL_TABLE)[::-1] or b"0", 2)
+        for line in lines
+    ]
+
+
+def dilate_masks(masks):
+    """
+    Spread every set bit to its eight neighbours.
+
+    >>> [bin(mask) for mask in dilate_masks([0b0, 0b100, 0b0, 0b0])]
+    ['0b1110', '0b1110', '0b1110', '0b0']
+    """
+    row_dilated = [mask | (mask << 1) | (mask >> 1) for mask in masks]
+    padded = [0, *row_dilated, 0]
+    return [
+        above | row | below
+        for above, row, below in zip(padded, padded[1:], padded[2:])
+    ]
+
+
+def get_part_numbers_by_mask(lines):
+    """
+    >>> schematic = load_input_lines(3, test=True)
+    >>> part_numbers = get_part_numbers_by_mask(schematic)
+    >>> part_numbers[:3]
+    [467, 35, 633]
+    >>> sum(part_numbers)
+    4361
+    """
+    symbol_neighbourhood = dilate_masks(get_symbol_masks(lines))
+    part_numbers = []
+    for line_number, line in enumerate(lines):
+        for number_match in re.finditer(r"\d+", line):
+            x_start, x_end = number_match.span()
+            digit_run = ((1 << (x_end - x_start)) - 1) << x_start
+            if digit_run & symbol_neighbourhood[line_number]:
+                part_numbers.append(int(number_match.group()))
+    return part_numbers
+
+
+def parse_row(line):
+    """
+    >>> parse_row("467..114..")
+    ('467..114..', [(0, 3, 467), (5, 8, 114)])
+    """
+    numbers = [
+        (*number_match.span(), int(number_match.group()))
+        for number_match in re.finditer(r"\d+", line)
+    ]
+    return line, numbers
+
+
+def window_events(rows):
+    """
+    Find the part numbers and gear ratios on the middle of three parsed rows.
+
+    >>> rows = [parse_row("467..114.."), parse_row("...*......"), parse_row("..35..633.")]
+    >>> list(window_events(rows))
+    [('gear_ratio', 16345)]
+    """
+    above, (line, numbers), below = rows
+    for x_start, x_end, number in numbers:
+        neighbours = "".join(
+            get_vertical_neighbours(row_line, x_start, x_end)
+            for row_line, _ in rows
+        )
+        if contains_symbol(neighbours):
+            yield ("part_number", number)
+    for star_match in re.finditer(r"\*", line):
+        x = star_match.start()
+        neighbouring_numbers = [
+            number
+            for _, row_numbers in rows
+            for x_start, x_end, number in row_numbers
+            if x_start <= x+1 and x-1 < x_end
+        ]
+        if len(neighbouring_numbers) == 2:
+            yield ("gear_ratio", prod(neighbouring_numbers))
+
+
+def stream_schematic(lines):
+    """
+    Read a schematic one line at a time, holding only three rows, and yield
+    ("part_number", n) and ("gear_ratio", n) events as each row completes.
+
+    >>> with open(file_path(3, test=True)) as input_file:
+    ...     events = list(stream_schematic(input_file))
+    >>> events[:3]
+    [('part_number', 467), ('gear_ratio', 16345), ('part_number', 35)]
+    >>> sum(n for kind, n in events if kind == "part_number")
+    4361
+    >>> sum(n for kind, n in events if kind == "gear_ratio")
+    467835
+    """
+    window = deque([parse_row("")], maxlen=3)
+    for line in lines:
+        window.append(parse_row(line.strip()))
+        if len(window) == 3:
+            yield from window_events(window)
+    window.append(parse_row(""))
+    if len(window) == 3:
+        yield from window_events(window)
+
 
 def solve_a():
-    numbers_with_neighbours = find_numbers_with_neighbours(schematic)
-    part_numbers = get_part_numbers(numbers_with_neighbours)
-    return sum(part_numbers)
+    numbers, labels = get_number_labels(schematic)
+    part_labels = set()
+    for location in get_symbol_locations(schematic):
+        part_labels |= neighbouring_labels(location, labels)
+    return sum(numbers[label] for label in part_labels)
 
 
 def solve_b():
-    star_locations = get_star_locations(schematic)
-    number_locations = get_number_locations(schematic)
-    gear_ratios = [
-        gear_ratio := is_gear(location, number_locations)["gear_ratio"]
-        for location in star_locations
-    ]
-    return sum(gear_ratios)
+    numbers, labels = get_number_labels(schematic)
+    return sum(
+        find_gear_ratio(location, numbers, labels)
+        for location in get_star_locations(schematic)
+    )
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import os
 import re
-from helpers import load_input_lines
+from collections import deque
+from helpers import file_path, load_input_lines
 
 TEST = os.environ.get("AOC_TEST", False)
 
@@ -58,21 +59,85 @@ def get_card_copies(card):
     return []
 
 
-cards = load_input_lines(4, test=TEST, transform=parse_card)
+def as_bitmask(number_str):
+    """
+    >>> bin(as_bitmask(" 1  3 4"))
+    '0b11010'
+    """
+    mask = 0
+    for number in number_str.split():
+        mask |= 1 << int(number)
+    return mask
+
+
+def parse_card_bitmasks(line):
+    """
+    >>> card_line = "Card 1: 41 48 83 86 17 | 83 86  6 31 17  9 48 53"
+    >>> card = parse_card_bitmasks(card_line)
+    >>> card["card_id"]
+    1
+    >>> card["winning_mask"] == as_bitmask("41 48 83 86 17")
+    True
+    """
+    _, numbers_part = line.split(":")
+    winning_str, my_number_str = numbers_part.split("|")
+    return {
+        "card_id": int(line[4:line.index(":")]),
+        "winning_mask": as_bitmask(winning_str),
+        "my_mask": as_bitmask(my_number_str),
+    }
+
+
+def get_match_counts(lines):
+    """
+    >>> get_match_counts(load_input_lines(4, test=True))
+    [4, 2, 2, 1, 0, 0]
+    """
+    match_counts = []
+    for line in lines:
+        card = parse_card_bitmasks(line)
+        match_counts.append((card["winning_mask"] & card["my_mask"]).bit_count())
+    return match_counts
+
+
+def count_cards_streaming(lines):
+    """
+    Count every original and copied card while reading cards one at a time.
+    Extra copies are kept as a difference array that only reaches as far
+    ahead as the largest win count seen so far.
+
+    >>> with open(file_path(4, test=True)) as input_file:
+    ...     count_cards_streaming(input_file)
+    30
+    """
+    total_cards = 0
+    extra_copies = 0
+    copy_changes = deque()
+    for line in lines:
+        card = parse_card_bitmasks(line)
+        wins = (card["winning_mask"] & card["my_mask"]).bit_count()
+        if copy_changes:
+            extra_copies += copy_changes.popleft()
+        copies = 1 + extra_copies
+        total_cards += copies
+        if wins > 0:
+            while len(copy_changes) <= wins:
+                copy_changes.append(0)
+            copy_changes[0] += copies
+            copy_changes[wins] -= copies
+    return total_cards
+
+
+match_counts = get_match_counts(load_input_lines(4, test=TEST))
 
 
 def solve_a():
-    return sum(get_points(card) for card in cards)
+    return sum(1 << (wins-1) for wins in match_counts if wins > 0)
 
 
 def solve_b():
-    card_counts = {card["card_id"]: 1 for card in cards}
-    for card in cards:
-        current_card_id = card["card_id"]
-        copies = get_card_copies(card)
-        for card_id in copies:
-            card_counts[card_id] += card_counts[current_card_id]
-    return sum(card_counts.values())
+    with open(file_path(4, test=TEST)) as input_file:
+        return count_cards_streaming(input_file)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import os
-from collections import deque, UserDict
-from helpers import load_input_lines
+from bisect import bisect_right
+from collections import Counter, deque, UserDict
+from concurrent.futures import ProcessPoolExecutor
+from helpers import file_path
 
 TEST = os.environ.get("AOC_TEST", False)
 
@@ -21,66 +23,301 @@ class RangeMap(UserDict):
                 return key + offset
         return key
 
+    def map_ranges(self, ranges):
+        """
+        Map half-open (start, end) ranges of keys, splitting them wherever
+        they cross the boundary of an entry.
+
+        >>> range_map = RangeMap({98: (50, 2), 50: (52, 48)})
+        >>> sorted(range_map.map_ranges([(45, 55), (97, 101)]))
+        [(45, 50), (50, 52), (52, 57), (99, 100), (100, 101)]
+        """
+        unmapped = list(ranges)
+        mapped = []
+        for min_source_number, (destination_number, map_range) in self.data.items():
+            max_source_number = min_source_number + map_range
+            offset = destination_number - min_source_number
+            remaining = []
+            for start, end in unmapped:
+                overlap_start = max(start, min_source_number)
+                overlap_end = min(end, max_source_number)
+                if overlap_start < overlap_end:
+                    mapped.append((overlap_start + offset, overlap_end + offset))
+                    if start < overlap_start:
+                        remaining.append((start, overlap_start))
+                    if overlap_end < end:
+                        remaining.append((overlap_end, end))
+                else:
+                    remaining.append((start, end))
+            unmapped = remaining
+        return mapped + unmapped
+
+    def compile(self):
+        """
+        >>> range_map = RangeMap({98: (50, 2), 50: (52, 48)})
+        >>> compiled = range_map.compile()
+        >>> compiled.starts, compiled.offsets
+        ([0, 50, 98, 100], [0, 2, -48, 0])
+        >>> compiled[99]
+        51
+        """
+        pieces = []
+        for min_source_number, (destination_number, map_range) in self.data.items():
+            pieces.append((min_source_number + map_range, 0))
+        for min_source_number, (destination_number, map_range) in self.data.items():
+            pieces.append((min_source_number, destination_number - min_source_number))
+        return CompiledRangeMap.from_pieces(pieces)
+
+
+class CompiledRangeMap:
+    """
+    A RangeMap flattened into parallel, sorted lists: every number from
+    starts[i] up to (but excluding) starts[i+1] is shifted by offsets[i].
+    starts[0] is always 0 and the last piece runs on forever.
+    """
+
+    def __init__(self, starts, offsets):
+        self.starts = starts
+        self.offsets = offsets
+
+    @classmethod
+    def from_pieces(cls, pieces):
+        """
+        Build from (start, offset) pairs. Where two pieces share a start,
+        the later one wins.
+
+        >>> compiled = CompiledRangeMap.from_pieces([(5, 0), (2, 3), (5, 1), (7, 1)])
+        >>> compiled.starts, compiled.offsets
+        ([0, 2, 5], [0, 3, 1])
+        """
+        offset_by_start = {0: 0}
+        for start, offset in pieces:
+            offset_by_start[start] = offset
+        starts, offsets = [], []
+        for start in sorted(offset_by_start):
+            offset = offset_by_start[start]
+            if offsets and offsets[-1] == offset:
+                continue
+            starts.append(start)
+            offsets.append(offset)
+        return cls(starts, offsets)
+
+    def __getitem__(self, key):
+        return key + self.offsets[bisect_right(self.starts, key) - 1]
+
+    def map_many(self, keys):
+        """
+        >>> compiled = RangeMap({98: (50, 2), 50: (52, 48)}).compile()
+        >>> compiled.map_many([0, 49, 50, 97, 98, 99, 100])
+        [0, 49, 52, 99, 50, 51, 100]
+        """
+        starts, offsets = self.starts, self.offsets
+        return [key + offsets[bisect_right(starts, key) - 1] for key in keys]
+
+    def pieces(self):
+        """
+        >>> list(RangeMap({98: (50, 2)}).compile().pieces())
+        [(0, 98, 0), (98, 100, -48), (100, None, 0)]
+        """
+        ends = self.starts[1:] + [None]
+        return zip(self.starts, ends, self.offsets)
+
+    def then(self, other):
+        """
+        Compose two maps: the result sends a key to other[self[key]].
+
+        >>> first = RangeMap({98: (50, 2), 50: (52, 48)}).compile()
+        >>> second = RangeMap({15: (0, 37), 52: (37, 2), 0: (39, 15)}).compile()
+        >>> chain = first.then(second)
+        >>> [chain[key] for key in (79, 14, 55, 13)] == [second[first[key]] for key in (79, 14, 55, 13)]
+        True
+        """
+        pieces = []
+        for start, end, offset in self.pieces():
+            image_start = start + offset
+            i = bisect_right(other.starts, image_start) - 1
+            pieces.append((start, offset + other.offsets[i]))
+            for i in range(i + 1, len(other.starts)):
+                if end is not None and other.starts[i] >= end + offset:
+                    break
+                pieces.append((other.starts[i] - offset, offset + other.offsets[i]))
+        return CompiledRangeMap.from_pieces(pieces)
+
+    def inverse(self):
+        """
+        >>> compiled = RangeMap({98: (50, 2), 50: (52, 48)}).compile()
+        >>> inverse = compiled.inverse()
+        >>> inverse[51]
+        [99]
+        >>> inverse[98]
+        [96]
+        >>> RangeMap({0: (10, 5)}).compile().inverse()[12]
+        [2, 12]
+        >>> RangeMap({0: (10, 5)}).compile().inverse()[3]
+        []
+        """
+        events = []
+        for start, end, offset in self.pieces():
+            events.append((start + offset, 1, offset))
+            if end is not None:
+                events.append((end + offset, -1, offset))
+        events.sort()
+
+        starts, offsets = [], []
+        active = Counter()
+        for i, (point, change, offset) in enumerate(events):
+            active[offset] += change
+            if i + 1 < len(events) and events[i + 1][0] == point:
+                continue
+            starts.append(point)
+            offsets.append(tuple(sorted(offset for offset, count in active.items() if count)))
+        return InverseRangeMap(starts, offsets)
+
+
+class InverseRangeMap:
+    """
+    The reverse of a CompiledRangeMap. A destination number may come from
+    several source numbers (or none), so each piece holds every offset that
+    lands on it.
+    """
+
+    def __init__(self, starts, offsets):
+        self.starts = starts
+        self.offsets = offsets
+
+    def __getitem__(self, key):
+        i = bisect_right(self.starts, key) - 1
+        if i < 0:
+            return []
+        return sorted(key - offset for offset in self.offsets[i])
+
+    def pieces(self):
+        ends = self.starts[1:] + [None]
+        return zip(self.starts, ends, self.offsets)
+
+    def first_key_from(self, source_ranges):
+        """
+        Scan destination numbers in ascending order and return the first one
+        that comes from any of the source ranges, or None.
+
+        >>> compiled = RangeMap({98: (50, 2), 50: (52, 48)}).compile()
+        >>> compiled.inverse().first_key_from([(96, 100)])
+        50
+        >>> compiled.inverse().first_key_from([(200, 300)])
+        200
+        """
+        source_ranges = sorted(source_ranges)
+        for start, end, offsets in self.pieces():
+            hits = []
+            for offset in offsets:
+                for source_start, source_end in source_ranges:
+                    hit_start = max(start, source_start + offset)
+                    hit_end = source_end + offset if end is None else min(end, source_end + offset)
+                    if hit_start < hit_end:
+                        hits.append(hit_start)
+                        break
+            if hits:
+                return min(hits)
+        return None
+
 
 class Almanac:
-    seeds = []
-    maps = {}
-    current_source_name = None
+
+    def __init__(self):
+        self.seeds = []
+        self.maps = {}
+        self.current_source_name = None
+        self.compiled_chains = {}
+        self.inverse_chains = {}
+
+    @classmethod
+    def from_lines(cls, lines):
+        """
+        >>> almanac = Almanac.from_lines(["seeds: 79 14", "", "seed-to-soil map:", "50 98 2"])
+        >>> almanac.seeds, almanac.maps["seed"]["entries"]
+        ([79, 14], {98: (50, 2)})
+        """
+        almanac = cls()
+        for line in lines:
+            almanac.parse_input_line(line.strip())
+        return almanac
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as input_file:
+            return cls.from_lines(input_file)
 
     @classmethod
-    def seeds_in_ranges(cls):
+    def load(cls, test=TEST):
+        return cls.from_file(file_path(5, test))
+
+    def seeds_in_ranges(self):
         """
-        >>> Almanac.parse_input_line("seeds: 79 5 90 3")
-        >>> list(Almanac.seeds_in_ranges())
+        >>> almanac = Almanac()
+        >>> almanac.parse_input_line("seeds: 79 5 90 3")
+        >>> list(almanac.seeds_in_ranges())
         [79, 80, 81, 82, 83, 90, 91, 92]
         """
-        remaining = cls.seeds.copy()
+        remaining = self.seeds.copy()
         while remaining:
             seed_number, range_length, *remaining = remaining
             yield from range(seed_number, seed_number + range_length)
 
+    def seed_ranges(self):
+        """
+        >>> almanac = Almanac()
+        >>> almanac.parse_input_line("seeds: 79 5 90 3")
+        >>> list(almanac.seed_ranges())
+        [(79, 84), (90, 93)]
+        """
+        seed_numbers = iter(self.seeds)
+        for seed_number, range_length in zip(seed_numbers, seed_numbers):
+            yield (seed_number, seed_number + range_length)
 
-    @classmethod
-    def parse_input_line(cls, line):
+    def parse_input_line(self, line):
         """
-        >>> Almanac.parse_input_line("seeds: 79 14 55 13")
-        >>> Almanac.seeds
+        >>> almanac = Almanac()
+        >>> almanac.parse_input_line("seeds: 79 14 55 13")
+        >>> almanac.seeds
         [79, 14, 55, 13]
-        >>> Almanac.parse_input_line("seed-to-soil map:")
-        >>> Almanac.maps['seed']['destination']
+        >>> almanac.parse_input_line("seed-to-soil map:")
+        >>> almanac.maps['seed']['destination']
         'soil'
-        >>> Almanac.parse_input_line("50 98 2")
-        >>> Almanac.maps['seed']['entries']
+        >>> almanac.parse_input_line("50 98 2")
+        >>> almanac.maps['seed']['entries']
         {98: (50, 2)}
         """
         match line.split():
             case ["seeds:", *seed_numbers]:
-                cls.seeds = [int(seed) for seed in seed_numbers]
+                self.seeds = [int(seed) for seed in seed_numbers]
             case [map_name, "map:"]:
-                cls.current_source_name, destination_name = map_name.split("-to-")
-                cls.maps[cls.current_source_name] = {
+                self.current_source_name, destination_name = map_name.split("-to-")
+                self.maps[self.current_source_name] = {
                     "destination": destination_name,
                     "entries": RangeMap(),
                 }
+                self.compiled_chains.clear()
+                self.inverse_chains.clear()
             case [destination_str, source_str, map_range_str]:
                 source = int(source_str)
                 destination = int(destination_str)
                 map_range = int(map_range_str)
-                cls.maps[cls.current_source_name]["entries"][source] = (destination, map_range)
+                self.maps[self.current_source_name]["entries"][source] = (destination, map_range)
+                self.compiled_chains.clear()
+                self.inverse_chains.clear()
             case "":
                 pass
 
-    @classmethod
-    def source_to_destination(cls, source_name, destination_name, source_number):
+    def source_to_destination(self, source_name, destination_name, source_number):
         """
-        >>> load_input_lines(5, test=True, transform=Almanac.parse_input_line, return_values=False)
-        >>> Almanac.source_to_destination("seed", "location", 79)
+        >>> almanac = Almanac.load(test=True)
+        >>> almanac.source_to_destination("seed", "location", 79)
         82
         """
         current_source = source_name
         current_source_number = source_number
         while True:
-            source_map = cls.maps[current_source]
+            source_map = self.maps[current_source]
             current_destination_name = source_map["destination"]
             current_destination_number = source_map["entries"][current_source_number]
             if current_destination_name == destination_name:
@@ -88,25 +325,112 @@ class Almanac:
             current_source = current_destination_name
             current_source_number = current_destination_number
 
+    def source_ranges_to_destination(self, source_name, destination_name, source_ranges):
+        """
+        >>> almanac = Almanac.load(test=True)
+        >>> sorted(almanac.source_ranges_to_destination("seed", "location", [(79, 80), (82, 83)]))
+        [(46, 47), (82, 83)]
+        """
+        current_source = source_name
+        current_ranges = list(source_ranges)
+        while True:
+            source_map = self.maps[current_source]
+            current_destination_name = source_map["destination"]
+            current_ranges = source_map["entries"].map_ranges(current_ranges)
+            if current_destination_name == destination_name:
+                return current_ranges
+            current_source = current_destination_name
 
-load_input_lines(5, test=TEST, transform=Almanac.parse_input_line, return_values=False)
+    def compile_chain(self, source_name, destination_name):
+        """
+        Compiled chains are cached per (source_name, destination_name) until
+        another map header or entry is parsed.
 
+        >>> almanac = Almanac.load(test=True)
+        >>> chain = almanac.compile_chain("seed", "location")
+        >>> chain[79]
+        82
+        >>> almanac.compile_chain("seed", "location") is chain
+        True
+        >>> almanac.parse_input_line("seed-to-soil map:")
+        >>> almanac.compile_chain("seed", "soil")[1]
+        1
+        """
+        key = (source_name, destination_name)
+        if key in self.compiled_chains:
+            return self.compiled_chains[key]
+        current_source = source_name
+        chain = None
+        while True:
+            source_map = self.maps[current_source]
+            compiled = source_map["entries"].compile()
+            chain = compiled if chain is None else chain.then(compiled)
+            if source_map["destination"] == destination_name:
+                self.compiled_chains[key] = chain
+                return chain
+            current_source = source_map["destination"]
 
-def solve_a():
-    return min(
-        Almanac.source_to_destination("seed", "location", seed)
-        for seed in Almanac.seeds
-    )
+    def inverse_chain(self, source_name, destination_name):
+        key = (source_name, destination_name)
+        if key not in self.inverse_chains:
+            self.inverse_chains[key] = self.compile_chain(source_name, destination_name).inverse()
+        return self.inverse_chains[key]
+
+    def sources_to_destinations(self, source_name, destination_name, source_numbers):
+        """
+        >>> almanac = Almanac.load(test=True)
+        >>> almanac.sources_to_destinations("seed", "location", [79, 14, 55, 13])
+        [82, 43, 86, 35]
+        """
+        chain = self.compile_chain(source_name, destination_name)
+        return chain.map_many(source_numbers)
+
+    def destination_to_source(self, source_name, destination_name, destination_number):
+        """
+        >>> almanac = Almanac.load(test=True)
+        >>> almanac.destination_to_source("seed", "location", 82)
+        [79]
+        >>> almanac.destination_to_source("seed", "soil", 51)
+        [99]
+        """
+        return self.inverse_chain(source_name, destination_name)[destination_number]
+
+    def lowest_destination_from_ranges(self, source_name, destination_name, source_ranges):
+        """
+        >>> almanac = Almanac.load(test=True)
+        >>> almanac.lowest_destination_from_ranges("seed", "location", almanac.seed_ranges())
+        46
+        """
+        inverse = self.inverse_chain(source_name, destination_name)
+        return inverse.first_key_from(source_ranges)
 
 
-def solve_b():
-    print("creating list")
-    seeds = list(Almanac.seeds_in_ranges())
-    print("list is length:", len(seeds))
-    return min(
-        Almanac.source_to_destination("seed", "location", seed)
-        for seed in seeds
+def solve_a(almanac=None):
+    if almanac is None:
+        almanac = Almanac.load(test=TEST)
+    return min(almanac.sources_to_destinations("seed", "location", almanac.seeds))
+
+
+def solve_b(almanac=None):
+    if almanac is None:
+        almanac = Almanac.load(test=TEST)
+    location_ranges = almanac.source_ranges_to_destination(
+        "seed", "location", almanac.seed_ranges()
     )
+    return min(start for start, end in location_ranges)
+
+
+def solve_almanac_file(path):
+    almanac = Almanac.from_file(path)
+    return (solve_a(almanac), solve_b(almanac))
+
+
+def solve_almanac_files(paths, max_workers=None):
+    """
+    Solve several almanac files in parallel, one process per file.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(solve_almanac_file, paths))
 
 
 if __name__ == "__main__":
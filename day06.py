@@ -1,5 +1,5 @@
 import os
-from math import ceil, prod, sqrt
+from math import ceil, isqrt, prod, sqrt
 from helpers import load_input_lines
 
 TEST = os.environ.get("AOC_TEST", False)
@@ -31,6 +31,44 @@ def number_of_winning_times(race_time, winning_distance):
     return bracket_end_excl - bracket_start
 
 
+def number_of_winning_times_exact(race_time, winning_distance):
+    """
+    The same count as number_of_winning_times, using only integer
+    arithmetic so that it stays exact for races of any size.
+    isqrt rounds down, so the first guess is at most one short of the
+    first winning charge time.
+
+    >>> number_of_winning_times_exact(7, 9)
+    4
+    >>> number_of_winning_times_exact(30, 200)
+    9
+    >>> number_of_winning_times_exact(3, 2)
+    0
+    >>> number_of_winning_times_exact(2 * 10**20, 10**40 - 1)
+    1
+    >>> number_of_winning_times_exact(2 * 10**20, 10**40)
+    0
+    """
+    discriminant = race_time**2 - 4*winning_distance
+    if discriminant <= 0:
+        return 0
+    first_charge_time = (race_time - isqrt(discriminant)) // 2
+    if first_charge_time * (race_time - first_charge_time) <= winning_distance:
+        first_charge_time += 1
+    return max(race_time - 2*first_charge_time + 1, 0)
+
+
+def numbers_of_winning_times(races):
+    """
+    >>> numbers_of_winning_times([(7, 9), (15, 40), (30, 200)])
+    [4, 8, 9]
+    """
+    return [
+        number_of_winning_times_exact(race_time, winning_distance)
+        for race_time, winning_distance in races
+    ]
+
+
 def load_races_part_a(test=TEST):
     """
     >>> list(load_races_part_a(test=True))
@@ -57,14 +95,11 @@ def load_races_part_b(test=TEST):
 
 
 def solve_a():
-    product = 1
-    for time, distance in load_races_part_a(test=TEST):
-        product *= number_of_winning_times(time, distance)
-    return product
+    return prod(numbers_of_winning_times(load_races_part_a(test=TEST)))
 
 
 def solve_b():
-    return number_of_winning_times(*load_races_part_b())
+    return number_of_winning_times_exact(*load_races_part_b())
 
 
 
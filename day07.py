@@ -1,10 +1,25 @@
+import heapq
 import os
+import struct
 from collections import Counter
-from helpers import load_input_lines
+from itertools import islice
+from operator import itemgetter
+from tempfile import TemporaryDirectory
+from helpers import file_path, load_input_lines
 
 
 TEST = os.environ.get("AOC_TEST", False)
 
+hand_types = (
+    [1, 1],     # high card
+    [2, 1],     # one pair
+    [2, 2],     # two pair
+    [3, 1],     # three of a kind
+    [3, 2],     # full house
+    [4, 1],     # four of a kind
+    [5],        # five of a kind
+)
+
 
 def adjust_for_jokers(counts):
     """
@@ -33,15 +48,6 @@ def hand_type_strength(hand, joker):
     >>> hand_type_strength("KTJJT", joker=True)
     5
     """
-    hand_types = (
-        [1, 1],     # high card
-        [2, 1],     # one pair
-        [2, 2],     # two pair
-        [3, 1],     # three of a kind
-        [3, 2],     # full house
-        [4, 1],     # four of a kind
-        [5],        # five of a kind
-    )
     counts = Counter(hand)
     if joker and not hand == "JJJJJ":
         counts = adjust_for_jokers(counts)
@@ -68,6 +74,155 @@ def hand_strength(hand, joker=False):
     return (hand_type_strength(hand, joker), *hand_card_strength(hand, joker))
 
 
+def partitions(n, largest=None):
+    """
+    >>> list(partitions(3))
+    [(3,), (2, 1), (1, 1, 1)]
+    """
+    if n == 0:
+        yield ()
+        return
+    largest = n if largest is None else largest
+    for first in range(min(n, largest), 0, -1):
+        for rest in partitions(n - first, first):
+            yield (first, *rest)
+
+
+def build_hand_type_table():
+    """
+    Map (card counts excluding jokers, number of jokers) to a hand type, for
+    every possible hand. Without the joker rule, jokers are just counted
+    with the other cards.
+    """
+    table = {}
+    for jokers in range(6):
+        for counts in partitions(5 - jokers):
+            adjusted_counts = list(counts) or [0]
+            adjusted_counts[0] += jokers
+            table[(counts, jokers)] = hand_types.index(adjusted_counts[:2])
+    return table
+
+
+hand_type_table = build_hand_type_table()
+
+card_rank_tables = {
+    joker: str.maketrans(cards, "0123456789abc")
+    for joker, cards in ((False, "23456789TJQKA"), (True, "J23456789TQKA"))
+}
+
+
+def hand_key(hand, joker=False):
+    """
+    Pack a hand's strength into one integer: the hand type above five
+    4-bit card ranks.
+
+    >>> hex(hand_key("KTJJT"))
+    '0x2b8998'
+    >>> hex(hand_key("KTJJT", joker=True))
+    '0x5b9009'
+    >>> hand_key("JJJJJ", joker=True) < hand_key("22222", joker=True)
+    True
+    """
+    jokers = hand.count("J") if joker else 0
+    counts = tuple(sorted(
+        (hand.count(card) for card in set(hand) if not (jokers and card == "J")),
+        reverse=True,
+    ))
+    hand_type = hand_type_table[(counts, jokers)]
+    return hand_type << 20 | int(hand.translate(card_rank_tables[joker]), 16)
+
+
+hand_key_space = len(hand_types) << 20
+
+
+class FenwickTree:
+    """
+    A binary indexed tree over the integers 0 to size-1. Nodes are kept in a
+    dict, so only the parts of a large key space that are used take memory.
+
+    >>> tree = FenwickTree(16)
+    >>> tree.add(3, 5)
+    >>> tree.add(9, 2)
+    >>> tree.prefix_sum(2), tree.prefix_sum(3), tree.prefix_sum(15)
+    (0, 5, 7)
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.tree = {}
+
+    def add(self, index, value):
+        index += 1
+        while index <= self.size:
+            self.tree[index] = self.tree.get(index, 0) + value
+            index += index & -index
+
+    def prefix_sum(self, index):
+        """
+        The sum of every value added at index or below.
+        """
+        total = 0
+        index += 1
+        while index > 0:
+            total += self.tree.get(index, 0)
+            index -= index & -index
+        return total
+
+
+class RankedHands:
+    """
+    Keeps the total winnings up to date as hands arrive. A new hand takes
+    the rank after every hand at or below its key, and every hand above it
+    moves up one rank, adding each of their bids once more.
+
+    >>> ranked_hands = RankedHands()
+    >>> ranked_hands.add("32T3K", 765)
+    >>> ranked_hands.add("T55J5", 684)
+    >>> ranked_hands.total_winnings
+    2133
+    >>> for card in load_input_lines(7, test=True, transform=parse_card)[2:]:
+    ...     ranked_hands.add(card["hand"], card["bid"])
+    >>> ranked_hands.total_winnings
+    6440
+    """
+
+    def __init__(self, joker=False):
+        self.joker = joker
+        self.hand_counts = FenwickTree(hand_key_space)
+        self.bids = FenwickTree(hand_key_space)
+        self.total_bids = 0
+        self.total_winnings = 0
+
+    def add(self, hand, bid):
+        key = hand_key(hand, self.joker)
+        rank = self.hand_counts.prefix_sum(key) + 1
+        bids_above = self.total_bids - self.bids.prefix_sum(key)
+        self.total_winnings += rank * bid + bids_above
+        self.hand_counts.add(key, 1)
+        self.bids.add(key, bid)
+        self.total_bids += bid
+
+
+class Tournament:
+    """
+    >>> tournament = Tournament()
+    >>> tournament.add_cards(load_input_lines(7, test=True, transform=parse_card))
+    >>> tournament.total_winnings(), tournament.total_winnings(joker=True)
+    (6440, 5905)
+    """
+
+    def __init__(self):
+        self.ranked_hands = {joker: RankedHands(joker) for joker in (False, True)}
+
+    def add_cards(self, cards):
+        for card in cards:
+            for ranked_hands in self.ranked_hands.values():
+                ranked_hands.add(card["hand"], card["bid"])
+
+    def total_winnings(self, joker=False):
+        return self.ranked_hands[joker].total_winnings
+
+
 def parse_card(line):
     """
     >>> parse_card("KTJJT 220")
@@ -83,14 +238,60 @@ def parse_card(line):
 
 def get_total_winnings(joker=False):
     cards = load_input_lines(7, test=TEST, transform=parse_card)
-    card_strength = lambda card: hand_strength(card["hand"], joker)
-    sorted_cards = sorted(cards, key=card_strength)
-    ranked_cards = enumerate(sorted_cards, start=1)
-    winnings = [
-        rank * card["bid"]
-        for rank, card in ranked_cards
-    ]
-    return sum(winnings)
+    keys = [hand_key(card["hand"], joker) for card in cards]
+    ranked_indices = sorted(range(len(cards)), key=keys.__getitem__)
+    return sum(
+        rank * cards[i]["bid"]
+        for rank, i in enumerate(ranked_indices, start=1)
+    )
+
+
+hand_record = struct.Struct("<QQ")
+
+
+def write_records(records, path):
+    with open(path, "wb") as chunk_file:
+        for record in records:
+            chunk_file.write(hand_record.pack(*record))
+
+
+def read_records(path, records_per_read=4096):
+    with open(path, "rb") as chunk_file:
+        while block := chunk_file.read(hand_record.size * records_per_read):
+            yield from hand_record.iter_unpack(block)
+
+
+def get_total_winnings_external(joker=False, path=None, chunk_size=100_000):
+    """
+    Like get_total_winnings, but only chunk_size hands are held in memory
+    at once. Each chunk is sorted by hand_key and spilled to a temporary
+    file as packed (key, bid) records, and the winnings are summed while
+    the chunks are merged.
+
+    >>> get_total_winnings_external(path=file_path(7, test=True), chunk_size=2)
+    6440
+    >>> get_total_winnings_external(joker=True, path=file_path(7, test=True), chunk_size=2)
+    5905
+    """
+    path = path or file_path(7, test=TEST)
+    with TemporaryDirectory() as directory, open(path) as input_file:
+        chunk_paths = []
+        cards = (parse_card(line) for line in input_file if line.strip())
+        while chunk := list(islice(cards, chunk_size)):
+            records = [(hand_key(card["hand"], joker), card["bid"]) for card in chunk]
+            records.sort(key=itemgetter(0))
+            chunk_path = os.path.join(directory, f"{len(chunk_paths)}.bin")
+            write_records(records, chunk_path)
+            chunk_paths.append(chunk_path)
+
+        merged_records = heapq.merge(
+            *(read_records(chunk_path) for chunk_path in chunk_paths),
+            key=itemgetter(0),
+        )
+        return sum(
+            rank * bid
+            for rank, (key, bid) in enumerate(merged_records, start=1)
+        )
 
 
 def solve_a():
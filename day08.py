@@ -1,48 +1,60 @@
 import os
-from math import lcm
+from array import array
+from itertools import product
+from math import gcd
 from helpers import load_input_lines
 
 TEST = os.environ.get("AOC_TEST", False)
 
 
-class Node:
+class Network:
+    """
+    Nodes are numbered in input order. left[i] and right[i] are the numbers
+    of node i's successors, and directions holds 0 for L and 1 for R.
 
-    all_nodes = {}
-    selected_nodes = []
+    >>> network = Network.load(test=True, test_suffix="a")
+    >>> network.names
+    ['AAA', 'BBB', 'ZZZ']
+    >>> list(network.left), list(network.right), list(network.directions)
+    ([1, 0, 2], [1, 2, 2], [0, 0, 1])
+    """
 
-    def __init__(self, name, left_name=None, right_name=None):
-        self.name = name
-        self.left_name = left_name
-        self.right_name = right_name
-        self.L = None
-        self.R = None
-        Node.all_nodes[name] = self
+    def __init__(self, direction_str, node_lines):
+        self.directions = bytes(direction == "R" for direction in direction_str)
+        self.names = []
+        successor_names = []
+        for line in node_lines:
+            name, rest = line.split(" = ")
+            self.names.append(name)
+            successor_names.append(rest[1:-1].split(", "))
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.left = array("l", (self.index[left_name] for left_name, _ in successor_names))
+        self.right = array("l", (self.index[right_name] for _, right_name in successor_names))
 
     @classmethod
-    def create_edges(cls):
-        for node in cls.all_nodes.values():
-            node.L = cls.all_nodes[node.left_name]
-            node.R = cls.all_nodes[node.right_name]
-
-    @classmethod
-    def from_line(cls, line):
-        name, rest = line.split(" = ")
-        left_name, right_name = rest[1:-1].split(", ")
-        return cls(name, left_name, right_name)
-
-    def __repr__(self):
-        return self.name
+    def load(cls, test=TEST, test_suffix=""):
+        direction_str, empty, *node_lines = load_input_lines(8, test, test_suffix=test_suffix)
+        return cls(direction_str, node_lines)
 
+    def end_flags(self, end_func):
+        return bytes(bool(end_func(name)) for name in self.names)
 
-def follow_directions(node, directions, end_func):
-    steps = 0
-    valid_end_nodes = {node for node in Node.all_nodes.values() if end_func(node)}
-    current_node = node
-    while not current_node in valid_end_nodes:
-        direction = next(directions)
-        current_node = getattr(current_node, direction)
-        steps += 1
-    return steps
+    def steps_to_end(self, start_name, end_func):
+        """
+        >>> network = Network.load(test=True, test_suffix="a")
+        >>> network.steps_to_end("AAA", lambda name: name == "ZZZ")
+        6
+        """
+        is_end = self.end_flags(end_func)
+        successors = (self.left, self.right)
+        directions = self.directions
+        number_of_directions = len(directions)
+        node = self.index[start_name]
+        steps = 0
+        while not is_end[node]:
+            node = successors[directions[steps % number_of_directions]][node]
+            steps += 1
+        return steps
 
 
 def repeat_iterable(iterable):
@@ -60,56 +72,254 @@ def repeat_iterable(iterable):
             yield from iterable
 
 
-def transform(line):
+def build_map(test=TEST, test_suffix=""):
+    """
+    >>> network = build_map(test=True, test_suffix="a")
+    >>> network.names[network.left[network.index["BBB"]]]
+    'AAA'
     """
-    >>> transform("")
-    >>> s = transform("abc")
-    >>> [next(s), next(s), next(s), next(s)]
-    ['a', 'b', 'c', 'a']
-    >>> node = transform("AAA = (BBB, CCC)")
-    >>> node.left_name
+    return Network.load(test=test, test_suffix=test_suffix)
+
+
+class JumpTables:
+    """
+    Binary lifting over whole passes of the directions. For every node,
+    pass_jumps[j][node] is where 2**j passes starting at that node end up,
+    and pass_hits[j][node] says whether an end node is reached on the way
+    (counting the starting node, but not the node the passes end on).
+
+    Within a pass, rest_of_pass_end[offset][node] is where the pass ends
+    when starting at node with the given offset into the directions, and
+    rest_of_pass_hit[offset][node] is the number of steps to the first end
+    node before then, or None. These take memory proportional to the
+    number of nodes times the number of directions.
+
+    >>> network = Network.load(test=True, test_suffix="a")
+    >>> tables = JumpTables(network, lambda name: name == "ZZZ")
+    >>> tables.first_end_offset
+    [None, None, 0]
+    >>> network.names[tables.position_after(network.index["AAA"], 5)]
     'BBB'
+    >>> tables.steps_to_end(network.index["AAA"])
+    6
+    >>> tables.steps_to_end(network.index["AAA"], offset=2)
+    4
+    >>> tables.steps_to_end(network.index["AAA"], offset=5)
+    4
     """
-    if line:
-        if "=" in line:
-            return Node.from_line(line)
-        elif line:
-            return repeat_iterable(line)
 
+    def __init__(self, network, end_func):
+        self.network = network
+        self.is_end = network.end_flags(end_func)
+        self.successors = (network.left, network.right)
+        nodes = range(len(network.names))
 
-def build_map(test=TEST, test_suffix=""):
+        # Fill the within-pass tables backwards from the end of the pass.
+        pass_end = list(nodes)
+        pass_hit = [None for node in nodes]
+        self.rest_of_pass_end = [None] * len(network.directions)
+        self.rest_of_pass_hit = [None] * len(network.directions)
+        for offset in reversed(range(len(network.directions))):
+            successors = self.successors[network.directions[offset]]
+            pass_end = [pass_end[successors[node]] for node in nodes]
+            pass_hit = [
+                0 if self.is_end[node]
+                else None if (hit := pass_hit[successors[node]]) is None
+                else hit + 1
+                for node in nodes
+            ]
+            self.rest_of_pass_end[offset] = pass_end
+            self.rest_of_pass_hit[offset] = pass_hit
+        self.first_end_offset = self.rest_of_pass_hit[0]
+
+        self.pass_jumps = [self.rest_of_pass_end[0]]
+        self.pass_hits = [[offset is not None for offset in self.first_end_offset]]
+        # After as many passes as there are nodes, the walk is in a loop, so
+        # an end node not reached by then is never reached.
+        self.hit_levels = len(nodes).bit_length() + 1
+        while len(self.pass_jumps) < self.hit_levels:
+            self.add_level()
+
+    def add_level(self):
+        jumps, hits = self.pass_jumps[-1], self.pass_hits[-1]
+        nodes = range(len(jumps))
+        self.pass_jumps.append([jumps[jumps[node]] for node in nodes])
+        self.pass_hits.append([hits[node] or hits[jumps[node]] for node in nodes])
+
+    def position_after(self, node, steps, offset=0):
+        """
+        The node reached after the given number of steps, starting at the
+        given offset into the directions. Whole passes are jumped in
+        O(log steps); the final partial pass is still walked one step at a
+        time, so this costs up to len(directions) more.
+        """
+        directions = self.network.directions
+        offset %= len(directions)
+        if offset and steps >= len(directions) - offset:
+            node = self.rest_of_pass_end[offset][node]
+            steps -= len(directions) - offset
+            offset = 0
+        passes, steps = divmod(steps, len(directions))
+        level = 0
+        while passes:
+            if level == len(self.pass_jumps):
+                self.add_level()
+            if passes & 1:
+                node = self.pass_jumps[level][node]
+            passes >>= 1
+            level += 1
+        for direction in directions[offset:offset + steps]:
+            node = self.successors[direction][node]
+        return node
+
+    def steps_to_end(self, node, offset=0):
+        """
+        The number of steps until an end node is first reached, starting
+        at the given offset into the directions, or None if it never is.
+        Costs O(log(number of nodes)).
+        """
+        directions = self.network.directions
+        offset %= len(directions)
+        steps = self.rest_of_pass_hit[offset][node]
+        if steps is not None:
+            return steps
+        steps = len(directions) - offset
+        node = self.rest_of_pass_end[offset][node]
+        if not self.pass_hits[self.hit_levels - 1][node]:
+            return None
+        for level in reversed(range(self.hit_levels)):
+            if not self.pass_hits[level][node]:
+                node = self.pass_jumps[level][node]
+                steps += len(directions) << level
+        return steps + self.first_end_offset[node]
+
+
+def ghost_cycles(network, start_nodes, end_func):
     """
-    >>> directions, nodes = build_map(test=True, test_suffix="a")
-    >>> next(directions)
-    'L'
-    >>> Node.all_nodes["BBB"].L.name
-    'AAA'
+    Walk every ghost at once until each one is back at a node where it has
+    already started a pass of the directions. Each ghost gets the step its
+    cycle starts at, the cycle length, and every step up to the end of its
+    first cycle at which it stood on an end node.
+
+    >>> network = Network.load(test=True, test_suffix="b")
+    >>> starts = [network.index["11A"], network.index["22A"]]
+    >>> ghost_cycles(network, starts, lambda name: name[2] == "Z")
+    [{'start': 2, 'length': 2, 'hits': [2]}, {'start': 2, 'length': 6, 'hits': [3, 6]}]
     """
-    directions, empty, *nodes = load_input_lines(8, test, transform=transform, test_suffix=test_suffix)
-    Node.create_edges()
-    return (directions, nodes)
+    is_end = network.end_flags(end_func)
+    successors = (network.left, network.right)
+    number_of_directions = len(network.directions)
+    nodes = list(start_nodes)
+    pass_starts = [{} for node in nodes]
+    hits = [[] for node in nodes]
+    cycles = [None] * len(nodes)
+    active = list(range(len(nodes)))
+    passes = 0
+    while active:
+        still_active = []
+        for ghost in active:
+            if nodes[ghost] in pass_starts[ghost]:
+                cycle_start = pass_starts[ghost][nodes[ghost]] * number_of_directions
+                cycles[ghost] = {
+                    "start": cycle_start,
+                    "length": passes * number_of_directions - cycle_start,
+                    "hits": hits[ghost],
+                }
+            else:
+                pass_starts[ghost][nodes[ghost]] = passes
+                still_active.append(ghost)
+        active = still_active
 
+        current_nodes = [nodes[ghost] for ghost in active]
+        for offset, direction in enumerate(network.directions):
+            steps = passes * number_of_directions + offset
+            for i, node in enumerate(current_nodes):
+                if is_end[node]:
+                    hits[active[i]].append(steps)
+            current_nodes = [successors[direction][node] for node in current_nodes]
+        for ghost, node in zip(active, current_nodes):
+            nodes[ghost] = node
+        passes += 1
+    return cycles
 
-def solve_a():
-    def part_a_end_func(node):
-        return node.name == "ZZZ"
 
-    directions, nodes = build_map(test=TEST, test_suffix="a")
-    node = Node.all_nodes["AAA"]
-    return follow_directions(node, directions, part_a_end_func)
+def combine_congruences(remainder_1, modulus_1, remainder_2, modulus_2):
+    """
+    Solve x = remainder_1 (mod modulus_1) and x = remainder_2 (mod modulus_2)
+    for moduli that need not be coprime. Returns (remainder, modulus) for
+    the combined congruence, or None if there is no solution.
+
+    >>> combine_congruences(2, 4, 3, 6)
+    >>> combine_congruences(2, 4, 4, 6)
+    (10, 12)
+    """
+    divisor = gcd(modulus_1, modulus_2)
+    difference = remainder_2 - remainder_1
+    if difference % divisor:
+        return None
+    reduced_modulus = modulus_2 // divisor
+    multiplier = (difference // divisor) * pow(modulus_1 // divisor, -1, reduced_modulus)
+    modulus = modulus_1 * reduced_modulus
+    return ((remainder_1 + modulus_1 * (multiplier % reduced_modulus)) % modulus, modulus)
+
+
+def is_cycle_hit(cycle, steps):
+    if steps >= cycle["start"]:
+        steps = cycle["start"] + (steps - cycle["start"]) % cycle["length"]
+    return steps in cycle["hits"]
+
+
+def first_common_hit(cycles):
+    """
+    The first step at which every ghost is on an end node, or None.
+
+    >>> first_common_hit([{'start': 2, 'length': 2, 'hits': [2]}, {'start': 2, 'length': 6, 'hits': [3, 6]}])
+    6
+    >>> first_common_hit([{'start': 0, 'length': 4, 'hits': [1, 3]}, {'start': 5, 'length': 3, 'hits': [0, 5]}])
+    5
+    >>> first_common_hit([{'start': 0, 'length': 2, 'hits': [0]}, {'start': 0, 'length': 2, 'hits': [1]}])
+    """
+    # Before every ghost is in its cycle, check each step directly.
+    all_cycling = max(cycle["start"] for cycle in cycles)
+    for steps in range(all_cycling):
+        if all(is_cycle_hit(cycle, steps) for cycle in cycles):
+            return steps
+
+    # After that, each ghost hits on fixed remainders of its cycle length.
+    cycle_remainders = [
+        [hit % cycle["length"] for hit in cycle["hits"] if hit >= cycle["start"]]
+        for cycle in cycles
+    ]
+    first_hit = None
+    for remainders in product(*cycle_remainders):
+        combined = (0, 1)
+        for remainder, cycle in zip(remainders, cycles):
+            combined = combine_congruences(*combined, remainder, cycle["length"])
+            if combined is None:
+                break
+        if combined is None:
+            continue
+        remainder, modulus = combined
+        steps = remainder + max(0, -(-(all_cycling - remainder) // modulus)) * modulus
+        if first_hit is None or steps < first_hit:
+            first_hit = steps
+    return first_hit
+
+
+def solve_a():
+    network = Network.load(test=TEST, test_suffix="a")
+    tables = JumpTables(network, lambda name: name == "ZZZ")
+    return tables.steps_to_end(network.index["AAA"])
 
 
 def solve_b():
-    def part_b_end_func(node):
-        return node.name[2] == "Z"
-
-    directions, nodes = build_map(test=TEST, test_suffix="b")
-    nodes = [node for node in nodes if node.name[2] == "A"]
-    steps_by_node = []
-    for node in nodes:
-        steps = follow_directions(node, directions, part_b_end_func)
-        steps_by_node.append(steps)
-    return lcm(*steps_by_node)
+    def part_b_end_func(name):
+        return name[2] == "Z"
+
+    network = Network.load(test=TEST, test_suffix="b")
+    start_nodes = [network.index[name] for name in network.names if name[2] == "A"]
+    cycles = ghost_cycles(network, start_nodes, part_b_end_func)
+    return first_common_hit(cycles)
 
 
 if __name__ == "__main__":
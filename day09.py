@@ -1,4 +1,7 @@
 import os
+from functools import cache
+from math import comb
+from operator import mul
 from helpers import load_input_lines
 
 TEST = os.environ.get("AOC_TEST", False)
@@ -24,6 +27,48 @@ def find_next_number(sequence):
         return sequence[-1] + find_next_number(next_level)
 
 
+@cache
+def extrapolation_coefficients(length):
+    """
+    Expanding the difference table down to a single number gives the next
+    and previous values as signed binomial sums over the sequence.
+
+    >>> extrapolation_coefficients(3)
+    ((1, -3, 3), (3, -3, 1))
+    """
+    next_coefficients = tuple((-1)**(length-1-i) * comb(length, i) for i in range(length))
+    previous_coefficients = tuple((-1)**i * comb(length, i+1) for i in range(length))
+    return next_coefficients, previous_coefficients
+
+
+def extrapolate_next(sequence):
+    """
+    >>> extrapolate_next([10, 13, 16, 21, 30, 45])
+    68
+    """
+    next_coefficients, _ = extrapolation_coefficients(len(sequence))
+    return sum(map(mul, next_coefficients, sequence))
+
+
+def extrapolate_previous(sequence):
+    """
+    >>> extrapolate_previous([10, 13, 16, 21, 30, 45])
+    5
+    """
+    _, previous_coefficients = extrapolation_coefficients(len(sequence))
+    return sum(map(mul, previous_coefficients, sequence))
+
+
+def extrapolate(sequence):
+    """
+    >>> extrapolate([10, 13, 16, 21, 30, 45])
+    (5, 68)
+    >>> extrapolate([7])
+    (7, 7)
+    """
+    return extrapolate_previous(sequence), extrapolate_next(sequence)
+
+
 def as_list_of_ints(string):
     return [int(s) for s in string.split()]
 
@@ -32,12 +77,11 @@ sequences = load_input_lines(9, test=TEST, transform=as_list_of_ints)
 
 
 def solve_a():
-    return sum(find_next_number(sequence) for sequence in sequences)
+    return sum(extrapolate_next(sequence) for sequence in sequences)
 
 
 def solve_b():
-    reversed_sequences = [list(reversed(s)) for s in sequences]
-    return sum(find_next_number(sequence) for sequence in reversed_sequences)
+    return sum(extrapolate_previous(sequence) for sequence in sequences)
 
 
 if __name__ == "__main__":
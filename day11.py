@@ -1,5 +1,6 @@
 import os
-from helpers import load_input_lines
+from bisect import bisect_left
+from helpers import file_path, load_input_lines
 
 TEST = os.environ.get("AOC_TEST", False)
 
@@ -94,12 +95,60 @@ def get_coordinates(lines, expand_by=1):
         line_number += 1
 
 
+def scan_galaxies(lines):
+    """
+    Read a map one line at a time, keeping only the galaxies and sorted
+    lists of the rows and columns that have one.
+
+    >>> scan = scan_galaxies(["...#", "....", "#..."])
+    >>> scan["galaxies"]
+    [(3, 0), (0, 2)]
+    >>> scan["occupied_rows"], scan["occupied_columns"]
+    ([0, 2], [0, 3])
+    """
+    galaxies = []
+    occupied_rows = []
+    occupied_columns = set()
+    for y, line in enumerate(lines):
+        x = line.find("#")
+        if x != -1:
+            occupied_rows.append(y)
+        while x != -1:
+            galaxies.append((x, y))
+            occupied_columns.add(x)
+            x = line.find("#", x+1)
+    return {
+        "galaxies": galaxies,
+        "occupied_rows": occupied_rows,
+        "occupied_columns": sorted(occupied_columns),
+    }
+
+
+def empty_lines_before(occupied, index):
+    """
+    >>> empty_lines_before([0, 3], 3)
+    2
+    """
+    return index - bisect_left(occupied, index)
+
+
+def expand_galaxies(scan, expand_by=1):
+    """
+    >>> scan = scan_galaxies(["...#", "....", "#..."])
+    >>> list(expand_galaxies(scan))
+    [(5, 0), (0, 3)]
+    """
+    for x, y in scan["galaxies"]:
+        yield (
+            x + expand_by * empty_lines_before(scan["occupied_columns"], x),
+            y + expand_by * empty_lines_before(scan["occupied_rows"], y),
+        )
+
+
 def load_galaxies(expand_by=1):
-    raw_map_lines = load_input_lines(11, test=TEST)
-    map_marked_vertically = mark_vertical_expansion(raw_map_lines)
-    map_marked = mark_horizontal_expansion(map_marked_vertically)
-    galaxy_coordinates = get_coordinates(map_marked, expand_by=expand_by)
-    return list(galaxy_coordinates)
+    with open(file_path(11, test=TEST)) as input_file:
+        scan = scan_galaxies(input_file)
+    return list(expand_galaxies(scan, expand_by=expand_by))
 
 
 def unique_pairs(galaxies):
@@ -124,18 +173,76 @@ def distance(galaxy_1, galaxy_2):
     return abs(x1-x2) + abs(y1-y2)
 
 
+def axis_distance_sum(values):
+    """
+    The sum of |a - b| over every pair of values. Once sorted, each value is
+    at least as big as every value before it.
+
+    >>> axis_distance_sum([4, 0, 9])
+    18
+    """
+    total = 0
+    running_sum = 0
+    for i, value in enumerate(sorted(values)):
+        total += i*value - running_sum
+        running_sum += value
+    return total
+
+
+def total_distance(galaxies):
+    """
+    The sum of the distances between every pair of galaxies.
+
+    >>> total_distance([(9, 0), (0, 1), (4, 1)])
+    20
+    """
+    galaxies = list(galaxies)
+    x_coords = [x for x, y in galaxies]
+    y_coords = [y for x, y in galaxies]
+    return axis_distance_sum(x_coords) + axis_distance_sum(y_coords)
+
+
+def expansion_coefficients(lines):
+    """
+    The total distance is affine in the expansion factor: the unexpanded
+    total, plus (factor - 1) for every empty row or column crossed by each
+    pair. Returns those two coefficients.
+
+    >>> expansion_coefficients(load_input_lines(11, test=True))
+    (292, 82)
+    """
+    scan = scan_galaxies(lines)
+    base_distance = total_distance(scan["galaxies"])
+    empty_lines_crossed = total_distance(
+        (
+            empty_lines_before(scan["occupied_columns"], x),
+            empty_lines_before(scan["occupied_rows"], y),
+        )
+        for x, y in scan["galaxies"]
+    )
+    return base_distance, empty_lines_crossed
+
+
+def total_distances_by_factor(expansion_factors, lines=None):
+    """
+    >>> total_distances_by_factor([1, 2, 10, 100], load_input_lines(11, test=True))
+    [292, 374, 1030, 8410]
+    """
+    if lines is None:
+        lines = load_input_lines(11, test=TEST)
+    base_distance, empty_lines_crossed = expansion_coefficients(lines)
+    return [
+        base_distance + (factor - 1) * empty_lines_crossed
+        for factor in expansion_factors
+    ]
+
+
 def solve_a():
-    total_distance = 0
-    galaxies = load_galaxies()
-    pairs = unique_pairs(galaxies)
-    return sum(distance(*pair) for pair in pairs)
+    return total_distance(load_galaxies())
 
 
 def solve_b():
-    total_distance = 0
-    galaxies = load_galaxies(expand_by=999999)
-    pairs = unique_pairs(galaxies)
-    return sum(distance(*pair) for pair in pairs)
+    return total_distance(load_galaxies(expand_by=999999))
 
 
 if __name__ == "__main__":